@@ -5,35 +5,44 @@ using either a YAML config or direct CLI input.
 """
 
 import argparse
+import re
 import sys
-from datetime import datetime, timezone
+import time
 from pathlib import Path
 
-import yaml
+TEMPLATE_RE = re.compile(r"\$PROJECT_NAME|\$LINKS|\$DATE")
+
+
+def parse_yaml(stream):
+    """Parse YAML, preferring libyaml's CSafeLoader when it is available."""
+    import yaml  # deferred: the --artifacts path never needs it
+
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:
+        from yaml import SafeLoader as Loader
+    return yaml.load(stream, Loader=Loader)
 
 
 def load_config(config_file: Path) -> dict:
     """Load and return the YAML config as a dictionary."""
     with config_file.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        return parse_yaml(f) or {}
 
 
 def render_template(
     template: str, project: str, artifacts: list[str], timestamp: str
 ) -> str:
-    """Render the Markdown index from the template and input data."""
-    seen = set()
-    uniq = [
-        a.strip()
-        for a in artifacts
-        if a.strip() and (a.lower() not in seen and not seen.add(a.lower()))
-    ]
-    links_block = "\n".join(f"- [{a}](./{a})" for a in uniq)
-    return (
-        template.replace("$PROJECT_NAME", project)
-        .replace("$LINKS", links_block)
-        .replace("$DATE", timestamp)
-    )
+    """Render the Markdown index from the template; the result ends in one newline."""
+    # Case-insensitive dedup keyed on the lowercased name, keeping the first spelling.
+    uniq: dict[str, str] = {}
+    for a in artifacts:
+        a = a.strip()
+        if a:
+            uniq.setdefault(a.lower(), a)
+    links_block = "\n".join([f"- [{a}](./{a})" for a in uniq.values()])
+    mapping = {"$PROJECT_NAME": project, "$LINKS": links_block, "$DATE": timestamp}
+    return TEMPLATE_RE.sub(lambda m: mapping[m.group(0)], template).rstrip() + "\n"
 
 
 def main():
@@ -68,12 +77,12 @@ def main():
         )
         sys.exit(1)
 
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d at %H:%M:%S UTC")
+    timestamp = time.strftime("%Y-%m-%d at %H:%M:%S UTC", time.gmtime())
     template_str = args.template.read_text(encoding="utf-8")
     index_md = render_template(template_str, project or "", artifacts, timestamp)
 
     args.out_md.parent.mkdir(parents=True, exist_ok=True)
-    args.out_md.write_text(index_md.rstrip() + "\n", encoding="utf-8")
+    args.out_md.write_text(index_md, encoding="utf-8")
 
     print(f"✔ Wrote {args.out_md}")
 
@@ -3,24 +3,50 @@
 Inject FEAST theme assets (_sass and _includes) into a local Jekyll site
 when `color_scheme: feast` is specified in docs/_config.yml.
 
-Robust against transient CI failures (e.g., GitHub clone flakiness), and includes
+Robust against transient CI failures (e.g., GitHub download flakiness), and includes
 retry logic, folder verification, and clear logging for debugging.
 """
 
+import argparse
+import http.client
+import os
+import re
 import shutil
 import subprocess
 import sys
+import tarfile
+import tempfile
 import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import yaml
-
 CONFIG_PATH = Path("docs/_config.yml")
 TEMP_CLONE_DIR = Path("_feast_temp")
-REMOTE_REPO_URL = "https://github.com/FEASTorg/FEASTorg.github.io.git"
+THEME_SHA_PATH = Path("docs/_feast_theme.sha")
+REMOTE_REPO_URL = "https://github.com/FEASTorg/FEASTorg.github.io"
+REMOTE_BRANCH = "main"
 WANTED_COLOR_SCHEME = "feast"
+DOCS_SASS = Path("docs/_sass")
+DOCS_INCLUDES = Path("docs/_includes")
+THEME_FOLDERS = {"_sass": DOCS_SASS, "_includes": DOCS_INCLUDES}  # name -> docs/ path
 RETRY_ATTEMPTS = 3
 RETRY_DELAY = 5  # seconds
+COLOR_SCHEME_LINE_RE = re.compile(rb"^color_scheme:.*$", re.M)
+COLOR_SCHEME_RE = re.compile(
+    rb"color_scheme:[ \t]+([\"']?)([A-Za-z0-9_-]+)\1(?:[ \t]+#.*)?[ \t]*\r?"
+)
+# An indented, non-comment line after the value continues a plain scalar.
+CONTINUATION_RE = re.compile(rb"\n(?:[ \t]*\r?\n)*[ \t]+[^#\s]")
+# Syntax under which a column-0 `color_scheme:` line may not be a top-level key:
+# flow collections, document markers, complex keys and multi-line quoted scalars.
+YAML_STRUCTURE_RE = re.compile(
+    rb"[{\[]"
+    rb"|^(?:---|\.\.\.|\?|:)(?:[ \t]|\r?$)"
+    rb"|(?:^|[:,-][ \t]+|^[ \t]+)"
+    rb"(?:\"(?:[^\"\\\r\n]|\\.)*|'(?:[^'\r\n]|'')*)\r?$",
+    re.M,
+)
 
 
 def log_banner():
@@ -30,69 +56,227 @@ def log_banner():
     print("=" * 50)
 
 
+def parse_yaml(data: bytes):
+    """Parse YAML (CSafeLoader when available), returning None if it is invalid."""
+    import yaml  # deferred: the regex fast path usually makes it unnecessary
+
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:
+        from yaml import SafeLoader as Loader
+    try:
+        return yaml.load(data, Loader=Loader)
+    except yaml.YAMLError:
+        return None
+
+
+def scan_color_scheme(data: bytes) -> str | None:
+    """
+    Return color_scheme from a line scan of a (valid) YAML file, or None when the
+    file needs a real YAML parse to be sure.
+    """
+    lines = list(COLOR_SCHEME_LINE_RE.finditer(data))
+    if len(lines) != 1 or YAML_STRUCTURE_RE.search(data):
+        return None
+    line = lines[0]
+    match = COLOR_SCHEME_RE.fullmatch(line.group(0))
+    if not match or CONTINUATION_RE.match(data, line.end()):
+        return None
+    return match.group(2).decode().lower()
+
+
 def load_color_scheme(config_path: Path) -> str | None:
     """Return the color_scheme from a Jekyll config.yml file, or None if not found or invalid."""
     if not config_path.exists():
         return None
     try:
-        with config_path.open("r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-        return str(config.get("color_scheme", "")).strip().lower()
-    except (yaml.YAMLError, OSError):
+        data = config_path.read_bytes()
+    except OSError:
         return None
 
+    color_scheme = scan_color_scheme(data)
+    if color_scheme is not None:
+        return color_scheme
 
-def clone_theme_repo(retries: int = RETRY_ATTEMPTS, delay: int = RETRY_DELAY) -> bool:
+    config = parse_yaml(data)
+    if not isinstance(config, dict):
+        return None
+    return str(config.get("color_scheme", "")).strip().lower()
+
+
+def resolve_remote_sha() -> str | None:
+    """Return the commit SHA of the remote theme branch, or None if it can't be resolved."""
+    try:
+        result = subprocess.run(
+            [
+                "git",
+                "ls-remote",
+                f"{REMOTE_REPO_URL}.git",
+                f"refs/heads/{REMOTE_BRANCH}",
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=60,
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"⚠ Could not resolve remote theme SHA.\n{e.stderr.strip()}")
+        return None
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠ Could not resolve remote theme SHA: {e}")
+        return None
+    sha, _, _ = result.stdout.partition("\t")
+    return sha.strip() or None
+
+
+def theme_cache_matches(sha: str) -> bool:
+    """Return True if docs/ already holds non-empty theme folders from commit `sha`."""
+    try:
+        if THEME_SHA_PATH.read_text(encoding="utf-8").strip() != sha:
+            return False
+    except OSError:
+        return False
+    for path in THEME_FOLDERS.values():
+        if count_entries(path) == 0:
+            return False
+    return True
+
+
+def fetch_theme_assets(
+    ref: str = f"refs/heads/{REMOTE_BRANCH}",
+    retries: int = RETRY_ATTEMPTS,
+    delay: int = RETRY_DELAY,
+) -> bool:
     """
-    Clone the remote theme repository to a temporary directory with retries.
-    Returns True if successful.
+    Download the theme repo archive at `ref` and extract only THEME_FOLDERS into a
+    temporary directory, with retries. Returns True if successful.
     """
-    print(f"🔄 Cloning theme repo to {TEMP_CLONE_DIR}...")
+    url = f"{REMOTE_REPO_URL}/archive/{ref}.tar.gz"
+    print(f"🔄 Downloading theme assets to {TEMP_CLONE_DIR}...")
     for attempt in range(1, retries + 1):
         try:
-            subprocess.run(
-                ["git", "clone", "--depth", "1", REMOTE_REPO_URL, str(TEMP_CLONE_DIR)],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-            )
-            print(f"✅ Clone successful on attempt {attempt}")
+            extract_theme_archive(url)
+            print(f"✅ Download successful on attempt {attempt}")
             return True
-        except subprocess.CalledProcessError as e:
-            print(
-                f"❌ Clone attempt {attempt} failed.\n{e.output.decode(errors='ignore')}"
-            )
+        except (OSError, tarfile.TarError, http.client.HTTPException) as e:
+            print(f"❌ Download attempt {attempt} failed.\n{e}")
+            if TEMP_CLONE_DIR.exists():
+                safe_rmtree(TEMP_CLONE_DIR)
             if attempt < retries:
                 print(f"⏳ Retrying in {delay} seconds...")
                 time.sleep(delay)
             else:
-                print("⛔ All attempts to clone the theme repo failed.")
+                print("⛔ All attempts to download the theme assets failed.")
     return False
 
 
+def extract_theme_archive(url: str) -> None:
+    """Stream the tarball at `url` and extract only THEME_FOLDERS to TEMP_CLONE_DIR."""
+    # Only honour the safe "data" filter where this Python supports it.
+    extract_kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        with tarfile.open(fileobj=resp, mode="r|gz") as tar:
+            for member in tar:
+                # Members are prefixed with "<repo>-<branch>/"; strip it.
+                _, _, rel = member.name.partition("/")
+                if rel.split("/", 1)[0] not in THEME_FOLDERS:
+                    continue
+                member.name = rel
+                tar.extract(member, TEMP_CLONE_DIR, **extract_kwargs)
+        # tarfile treats a cut-off stream as a clean end of archive, and
+        # http.client only raises IncompleteRead for chunked bodies. Check that
+        # the full Content-Length actually arrived.
+        resp.read()
+        if resp.length:
+            raise http.client.IncompleteRead(b"", resp.length)
+
+
 def copy_theme_assets() -> None:
-    """Copy the _sass and _includes folders from the cloned repo to the local docs/ directory."""
-    for folder in ["_sass", "_includes"]:
+    """
+    Move the _sass and _includes folders from the downloaded archive into docs/.
+    Falls back to a changed-files sync when the temp dir is on another filesystem.
+    Raises FileNotFoundError before touching docs/ if any folder is missing upstream.
+    """
+    for folder in THEME_FOLDERS:
         src = TEMP_CLONE_DIR / folder
-        dst = Path("docs") / folder
-        if dst.exists():
-            shutil.rmtree(dst)
-        shutil.copytree(src, dst)
+        if not src.is_dir():
+            raise FileNotFoundError(f"Theme archive has no '{folder}/' folder: {src}")
+
+    for folder, dst in THEME_FOLDERS.items():
+        src = TEMP_CLONE_DIR / folder
+        if src.stat().st_dev == dst.parent.stat().st_dev:
+            if dst.exists():
+                shutil.rmtree(dst)
+            os.replace(src, dst)
+        else:
+            sync_tree(src, dst)
+
+
+def sync_tree(src: Path, dst: Path) -> None:
+    """Make `dst` mirror `src`: prune stale entries, then copy only changed files."""
+    prune_stale(src, dst)
+    shutil.copytree(src, dst, copy_function=copy_if_changed, dirs_exist_ok=True)
+
+
+def copy_if_changed(src: str, dst: str) -> str:
+    """copy2 `src` to `dst` unless `dst` already has the same size and mtime."""
+    try:
+        src_stat = os.stat(src)
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return shutil.copy2(src, dst)
+    # Tar extraction and copy2 both preserve mtimes, so this pair is reliable.
+    if (
+        src_stat.st_size == dst_stat.st_size
+        and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+    ):
+        return dst
+    return shutil.copy2(src, dst)
+
+
+def prune_stale(src: Path, dst: Path) -> None:
+    """Remove entries under `dst` that are gone from `src` or changed file<->dir."""
+    if not dst.is_dir():
+        return
+    with os.scandir(dst) as it:
+        for entry in it:
+            src_path = src / entry.name
+            # copytree follows symlinks in src and writes real entries, so a
+            # symlink in dst is always stale.
+            if entry.is_symlink():
+                os.remove(entry.path)
+            elif entry.is_dir():
+                if src_path.is_dir():
+                    prune_stale(src_path, Path(entry.path))
+                else:
+                    shutil.rmtree(entry.path)
+            elif not src_path.is_file():
+                os.remove(entry.path)
 
 
 def verify_assets() -> bool:
     """Verify that the _sass and _includes folders exist and are non-empty."""
     success = True
-    for folder in ["_sass", "_includes"]:
-        path = Path("docs") / folder
-        if not path.exists() or not any(path.iterdir()):
+    for folder, path in THEME_FOLDERS.items():
+        count = count_entries(path)
+        if count == 0:
             print(f"🚨 Missing or empty: docs/{folder}/ — injection likely failed.")
             success = False
         else:
-            print(f"✅ Verified: docs/{folder}/ has {len(list(path.iterdir()))} items.")
+            print(f"✅ Verified: docs/{folder}/ has {count} items.")
     return success
 
 
+def count_entries(path: Path) -> int:
+    """Return the number of entries directly under `path` (0 if not a directory)."""
+    try:
+        with os.scandir(path) as it:
+            return sum(1 for _ in it)
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+
+
 def safe_rmtree(path: Path) -> bool:
     """Safely remove a directory, returning True if successful."""
     try:
@@ -105,6 +289,25 @@ def safe_rmtree(path: Path) -> bool:
 
 def main() -> None:
     """Main script logic for injecting FEAST theme assets."""
+    parser = argparse.ArgumentParser(description="Inject FEAST theme assets into docs/")
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=RETRY_ATTEMPTS,
+        help="Number of download attempts (1 disables retrying)",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=int,
+        default=RETRY_DELAY,
+        help="Seconds to wait between download attempts",
+    )
+    args = parser.parse_args()
+    if args.retries < 1:
+        parser.error("--retries must be at least 1")
+    if args.retry_delay < 0:
+        parser.error("--retry-delay must not be negative")
+
     log_banner()
 
     if not CONFIG_PATH.exists():
@@ -121,23 +324,56 @@ def main() -> None:
         f"🎨 Detected color_scheme: '{WANTED_COLOR_SCHEME}' — proceeding with injection."
     )
 
-    if TEMP_CLONE_DIR.exists():
-        if not safe_rmtree(TEMP_CLONE_DIR):
-            print(
-                f"⛔ Failed to clean temp dir '{TEMP_CLONE_DIR}'. Aborting to avoid conflicts."
-            )
-            sys.exit(1)
+    remote_sha = resolve_remote_sha()
+    if remote_sha and theme_cache_matches(remote_sha):
+        print(
+            f"✅ Theme assets already at {remote_sha[:12]} (cache hit), skipping download."
+        )
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        cleanup = None
+        if TEMP_CLONE_DIR.exists():
+            # Move the stale temp dir aside (cheap) and delete it in the
+            # background while the download runs.
+            stale_root = Path(tempfile.mkdtemp(prefix="_feast_stale_", dir="."))
+            try:
+                os.replace(TEMP_CLONE_DIR, stale_root / TEMP_CLONE_DIR.name)
+            except OSError as e:
+                print(
+                    f"⛔ Failed to clean temp dir '{TEMP_CLONE_DIR}': {e}. "
+                    "Aborting to avoid conflicts."
+                )
+                safe_rmtree(stale_root)
+                sys.exit(1)
+            cleanup = pool.submit(safe_rmtree, stale_root)
+
+        # Pin the download to the resolved commit so it matches the cached SHA.
+        ref = remote_sha or f"refs/heads/{REMOTE_BRANCH}"
+        fetched = fetch_theme_assets(ref, args.retries, args.retry_delay)
+        if cleanup is not None:
+            cleanup.result()
 
-    if not clone_theme_repo():
+    if not fetched:
         sys.exit(1)
 
-    copy_theme_assets()
+    try:
+        copy_theme_assets()
+    except FileNotFoundError as e:
+        print(f"⛔ {e}")
+        safe_rmtree(TEMP_CLONE_DIR)
+        sys.exit(1)
     safe_rmtree(TEMP_CLONE_DIR)
 
     if not verify_assets():
         print("❌ Asset verification failed. Please inspect logs.")
         sys.exit(1)
 
+    if remote_sha:
+        THEME_SHA_PATH.write_text(remote_sha + "\n", encoding="utf-8")
+    else:
+        THEME_SHA_PATH.unlink(missing_ok=True)
+
     print("✅ Theme assets injected and verified successfully.")
 
 